@@ -1,20 +1,17 @@
-import os
-from dotenv import load_dotenv
+import functools
+from typing import NamedTuple, Tuple
 
-load_dotenv()
+from .settings import settings
 
-TELNYX_API_KEY = os.getenv("TELNYX_API_KEY")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-PUBLIC_DOMAIN = os.getenv("DOMAIN")  # e.g., voice.example.com
+TELNYX_API_KEY = settings.telnyx_api_key
+OPENAI_API_KEY = settings.openai_api_key
+PUBLIC_DOMAIN = settings.public_domain  # e.g., voice.example.com
 
-if not TELNYX_API_KEY or not OPENAI_API_KEY or not PUBLIC_DOMAIN:
-    raise RuntimeError("Missing required env vars: TELNYX_API_KEY, OPENAI_API_KEY, DOMAIN")
+AGENT_VOICE = settings.agent_voice   # alloy|echo|fable|onyx|nova|shimmer|marin
 
-AGENT_VOICE = os.getenv("AGENT_VOICE", "marin")   # alloy|echo|fable|onyx|nova|shimmer|marin
-
-AGENT_INSTRUCTIONS = os.getenv(
-    "AGENT_INSTRUCTIONS",
-    """You are a professional AI voice assistant for our company. You're here to help callers with their questions and connect them with the right people when needed.
+AGENT_INSTRUCTIONS = settings.agent_instructions
+if AGENT_INSTRUCTIONS is None:
+    AGENT_INSTRUCTIONS = """You are a professional AI voice assistant for our company. You're here to help callers with their questions and connect them with the right people when needed.
 
 Your approach:
 - Be friendly, professional, and helpful
@@ -50,53 +47,45 @@ Call management:
 - Always explain what's happening before transferring or ending calls
 - Thank callers for their time{transfer_instructions}
 """
+
+class Department(NamedTuple):
+    name: str
+    sip_uri: str
+    header_value: str  # P-Called-Party-ID header sent with transfers
+
+# Department configuration for call transfers (read-only)
+DEPARTMENTS: Tuple[Department, ...] = tuple(
+    Department(name, sip_uri, header_value)
+    for name, (sip_uri, header_value) in settings.departments.items()
 )
 
-# Department configuration for call transfers
-DEPARTMENTS = {
-    "sales": {
-        "sip_uri": os.getenv("SALES_SIP_URI", ""),
-        "headers": [
-            {
-                "name": "P-Called-Party-ID",
-                "value": os.getenv("SALES_P_Called_Party_ID_HEADER", "")
-            }
-        ]
-    },
-    "support": {
-        "sip_uri": os.getenv("SUPPORT_SIP_URI", ""),
-        "headers": [
-            {
-                "name": "P-Called-Party-ID", 
-                "value": os.getenv("SUPPORT_P_Called_Party_ID_HEADER", "")
-            }
-        ]
-    },
-    "billing": {
-        "sip_uri": os.getenv("BILLING_SIP_URI", ""),
-        "headers": [
-            {
-                "name": "P-Called-Party-ID",
-                "value": os.getenv("BILLING_P_Called_Party_ID_HEADER", "")
-            }
-        ]
-    }
-}
+_DEPARTMENT_NAMES = ", ".join(dept.name for dept in DEPARTMENTS)
+
+def _unescape_braces(text: str) -> str:
+    """Collapse {{ and }} the way str.format did, so custom instructions can keep escaping braces"""
+    return text.replace("{{", "{").replace("}}", "}")
 
+# The template has a single placeholder, split once so it can be spliced in by concatenation
+_INSTRUCTIONS_PREFIX, _PLACEHOLDER, _INSTRUCTIONS_SUFFIX = (
+    _unescape_braces(part) for part in AGENT_INSTRUCTIONS.partition("{transfer_instructions}")
+)
+
+@functools.lru_cache(maxsize=1)
 def get_formatted_instructions():
     """
     Get agent instructions with dynamically populated department list
     Only includes transfer instructions if departments are configured
+    Cached since DEPARTMENTS is built once from env at import and never changes
     """
-    if DEPARTMENTS and len(DEPARTMENTS) > 0:
-        available_departments = ", ".join(DEPARTMENTS.keys())
-        transfer_instructions = f"\n- When a caller needs specialized assistance, use the transfer_call function to connect them to the right department.\n- Available departments for transfer: {available_departments} IMPORTANT: Never call both transfer_call and end_call in the same conversation. Choose one action only."
+    if DEPARTMENTS:
+        transfer_instructions = f"\n- When a caller needs specialized assistance, use the transfer_call function to connect them to the right department.\n- Available departments for transfer: {_DEPARTMENT_NAMES} IMPORTANT: Never call both transfer_call and end_call in the same conversation. Choose one action only."
     else:
         transfer_instructions = ""
-    
-    return AGENT_INSTRUCTIONS.format(transfer_instructions=transfer_instructions)
 
-AGENT_GREETING = os.getenv(
-    "AGENT_GREETING",
-    "Hello! Thank you for calling. I'm your AI assistant and I'm here to help you today. How can I assist you?"
-)
+    if not _PLACEHOLDER:
+        return _INSTRUCTIONS_PREFIX
+    return _INSTRUCTIONS_PREFIX + transfer_instructions + _INSTRUCTIONS_SUFFIX
+
+AGENT_GREETING = settings.agent_greeting
+if AGENT_GREETING is None:
+    AGENT_GREETING = "Hello! Thank you for calling. I'm your AI assistant and I'm here to help you today. How can I assist you?"
@@ -1,18 +1,28 @@
 import os
-import json
+import base64
 import asyncio
+import functools
 import logging
-from datetime import datetime, timezone
+from contextlib import asynccontextmanager
 
+import orjson
 from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
-from fastapi.responses import JSONResponse
-from fastapi.middleware.cors import CORSMiddleware
-from dotenv import load_dotenv
-
-from .utils.telnyx_http import telnyx_cmd
-from .utils.function_tools import get_function_tools, handle_function_call, execute_pending_operation, has_pending_operation
-
-load_dotenv()
+from fastapi.responses import ORJSONResponse, Response
+from starlette.websockets import WebSocketState
+from websockets.exceptions import ConnectionClosed
+
+from .openai_pool import OpenAIConnectionPool
+from .settings import settings
+from .utils.telnyx_http import telnyx_cmd, open_client, close_client
+from .utils.tasks import spawn_tracked
+from .utils.function_tools import (
+    get_function_tools,
+    handle_function_call,
+    execute_pending_operation,
+    has_pending_operation,
+    clear_call_state,
+    sweep_call_states,
+)
 
 # -----------------------------
 # Config & logging
@@ -30,43 +40,179 @@ from .agent_config import (
 )
 
 
+# -----------------------------
+# OpenAI session payloads
+# -----------------------------
+# Voice, instructions, greeting and tools are fixed from env at import, so the
+# session.update and greeting events are serialized once instead of per call.
+# --- Correct Realtime session.update (includes session.type, nested audio, modalities) ---
+session_config = {
+    "type": "realtime",
+    "model": "gpt-realtime",
+    "output_modalities": ["audio"],
+    "audio": {
+        "input": {
+            "format": {"type": "audio/pcmu"},
+            "transcription": {
+                "model": "whisper-1"
+            },
+            "turn_detection": {
+                "type": "semantic_vad",
+                "eagerness": "high",
+                "create_response": True,
+                "interrupt_response": True
+            },
+        },
+        "output": {
+            "format": {"type": "audio/pcmu"},
+            "voice": AGENT_VOICE
+        },
+    },
+    "instructions": get_formatted_instructions(),
+}
+
+# Only include tools if there are any configured
+function_tools = get_function_tools()
+if function_tools and len(function_tools) > 0:
+    session_config["tools"] = function_tools
+    session_config["tool_choice"] = "auto"
+    tool_names = [tool["name"] for tool in function_tools]
+    logger.info(f"Including function tools: {', '.join(tool_names)}")
+else:
+    logger.info("No function tools configured - session will not include tools")
+
+SESSION_UPDATE_BYTES = orjson.dumps({
+    "type": "session.update",
+    "session": session_config
+})
+
+# --- Prompt an immediate greeting (audio) ---
+GREETING_BYTES = orjson.dumps({
+    "type": "response.create",
+    "response": {
+        "output_modalities": ["audio"],
+        "input": [],
+        "instructions": f"Say exactly this greeting: {AGENT_GREETING}",
+    },
+})
+
+# Audio frames only vary by their base64 payload (ASCII-safe, never needs
+# escaping), so they are assembled by concatenation instead of orjson.dumps.
+# The Realtime API only takes audio as base64 inside JSON events (no binary
+# frames), so a single chunk is forwarded untouched; chunks merged by a writer
+# are decoded, joined and re-encoded, since base64 padding rules out joining as-is.
+_PAYLOAD_SENTINEL = "__payload__"
+
+def _split_frame_template(frame: dict) -> tuple[str, str]:
+    """Serialize a frame holding _PAYLOAD_SENTINEL and split it into (prefix, suffix)"""
+    prefix, _, suffix = orjson.dumps(frame).decode().partition(_PAYLOAD_SENTINEL)
+    return prefix, suffix
+
+_APPEND_PREFIX, _APPEND_SUFFIX = (
+    part.encode() for part in _split_frame_template(
+        {"type": "input_audio_buffer.append", "audio": _PAYLOAD_SENTINEL}
+    )
+)
+
+# Upper bound on waiting for Telnyx to echo the audio_end mark (i.e. finish playing
+# the last response) before a pending hangup/transfer runs anyway
+MARK_ECHO_TIMEOUT_SECS = 2.0
+
+def _merge_b64(chunks: list[bytes]) -> bytes:
+    """Merge base64 chunks (ASCII bytes) into one payload, a single chunk is returned untouched"""
+    if len(chunks) == 1:
+        return chunks[0]
+    # Base64 strings can't be joined as-is (padding), so join the decoded bytes
+    return base64.b64encode(b"".join(map(base64.b64decode, chunks)))
+
+async def _drain(queue: asyncio.Queue, send_audio, send_frame, name: str):
+    """
+    Writer loop for one socket: send queued (is_audio, data) items in order
+
+    Audio is base64 ASCII bytes; consecutive chunks that piled up while a send was
+    in flight are merged and passed to send_audio as one payload. Anything else is
+    a pre-serialized frame for send_frame. Runs until cancelled or the socket fails.
+    """
+    # Hot-loop attribute lookups bound once
+    get, get_nowait, empty = queue.get, queue.get_nowait, queue.empty
+    try:
+        while True:
+            batch = [await get()]
+            while not empty():
+                batch.append(get_nowait())
+
+            audio_chunks = []
+            for is_audio, data in batch:
+                if is_audio:
+                    audio_chunks.append(data)
+                    continue
+                if audio_chunks:
+                    await send_audio(_merge_b64(audio_chunks))
+                    audio_chunks = []
+                await send_frame(data)
+            if audio_chunks:
+                await send_audio(_merge_b64(audio_chunks))
+    except asyncio.CancelledError:
+        raise
+    except ConnectionClosed:
+        logger.info(f"{name} WebSocket closed while writing")
+    except Exception as e:
+        logger.error(f"Error in {name} writer: {e}")
+
+# Max outbound Telnyx frames waiting on the writer; one drain coalesces at most this many chunks
+TELNYX_OUT_QUEUE_SIZE = 64
+# Same for caller audio and events waiting on the OpenAI writer
+OPENAI_OUT_QUEUE_SIZE = 64
+
+# Telnyx sends compact JSON, so media frames can be recognized and their base64
+# payload (no quotes or escapes) sliced out by token search. "event" leads the
+# frame, so the media check only looks at the first _MEDIA_EVENT_WINDOW chars.
+_MEDIA_EVENT_TOKEN = '"event":"media"'
+_MEDIA_EVENT_WINDOW = 64
+_PAYLOAD_TOKEN = '"payload":"'
+
+# Same for OpenAI audio deltas, matched on the raw frame bytes; "type" leads the event
+_DELTA_TYPE_TOKEN = b'"type":"response.output_audio.delta"'
+_DELTA_TOKEN = b'"delta":"'
+
+# Pre-warmed OpenAI Realtime connections, filled once the app starts
+openai_pool = OpenAIConnectionPool(OPENAI_API_KEY, settings.openai_pool_size)
 
 # -----------------------------
 # FastAPI app
 # -----------------------------
-app = FastAPI()
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Should report uvloop.Loop when started with --loop uvloop (see Dockerfile)
+    loop = asyncio.get_running_loop()
+    logger.info(f"Event loop: {type(loop).__module__}.{type(loop).__qualname__}")
+    open_client()
+    openai_pool.start()
+    sweeper = asyncio.create_task(sweep_call_states())
+    yield
+    sweeper.cancel()
+    await openai_pool.close()
+    await close_client()
+
+# No CORS middleware: the only clients are Telnyx webhooks/media streams and health checks, not browsers
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # -----------------------------
 # Health endpoint
 # -----------------------------
+# Static liveness body, serialized once for load balancers polling at a high rate
+_HEALTH_BODY = orjson.dumps({"status": "ok"})
+
 @app.get("/health")
-async def health() -> dict:
-    return {"status": "ok"}
+async def health() -> Response:
+    return Response(_HEALTH_BODY, media_type="application/json")
 
 # -----------------------------
 # Telnyx webhook
 # -----------------------------
-@app.post("/webhook")
-async def telnyx_webhook(request: Request):
-    event = await request.json()
-    logger.info(f"Received Telnyx webhook: {json.dumps(event, indent=2)}")
-
-    data = event.get("data", {})
-    payload = data.get("payload", {})
-    ev_type = data.get("event_type") or data.get("type") or data.get("record_type")
-    call_control_id = payload.get("call_control_id")
-
-    if not call_control_id:
-        logger.warning("No call_control_id in webhook event")
-        return JSONResponse({"status": "ignored", "reason": "missing call_control_id"})
-
-    if ev_type == "call.initiated":
+async def _answer_and_stream(call_control_id: str):
+    """Answer the call and start media streaming to our WS."""
+    try:
         logger.info(f"Answering call {call_control_id}")
         await telnyx_cmd(call_control_id, "answer", TELNYX_API_KEY)
 
@@ -82,6 +228,26 @@ async def telnyx_webhook(request: Request):
         }
         await telnyx_cmd(call_control_id, "streaming_start", TELNYX_API_KEY, body)
         logger.info(f"Started media streaming for call {call_control_id}")
+    except Exception as e:
+        logger.error(f"Error answering call {call_control_id}: {e}")
+
+@app.post("/webhook")
+async def telnyx_webhook(request: Request):
+    event = orjson.loads(await request.body())
+    logger.debug("Received Telnyx webhook: %s", event)
+
+    data = event.get("data", {})
+    payload = data.get("payload", {})
+    ev_type = data.get("event_type") or data.get("type") or data.get("record_type")
+    call_control_id = payload.get("call_control_id")
+
+    if not call_control_id:
+        logger.warning("No call_control_id in webhook event")
+        return ORJSONResponse({"status": "ignored", "reason": "missing call_control_id"})
+
+    if ev_type == "call.initiated":
+        # Ack Telnyx right away, answer + streaming_start run in the background
+        spawn_tracked(_answer_and_stream(call_control_id))
 
     elif ev_type == "call.hangup":
         logger.info(f"Call {call_control_id} ended")
@@ -114,7 +280,7 @@ async def telnyx_webhook(request: Request):
         else:
             logger.info("No detailed cost breakdown available")
 
-    return JSONResponse({"status": "ok"})
+    return ORJSONResponse({"status": "ok"})
 
 # -----------------------------
 # Telnyx Media WebSocket
@@ -124,22 +290,32 @@ async def telnyx_media(ws: WebSocket):
     await ws.accept()
     logger.info("Telnyx media WebSocket connection accepted")
 
-    import websockets
-
     openai_ws = None
-    forward_task = None
     stream_id = None
     call_control_id = None
+    media_prefix = None
+    media_suffix = None
+    mark_frame = None
+    clear_frame = None
+    function_tasks: set[asyncio.Task] = set()
 
     try:
         # Wait for Telnyx 'start' frame to get stream/call ids
         start_received = False
         while not start_received:
-            data = await ws.receive_json()
+            data = orjson.loads(await ws.receive_text())
             if data.get("event") == "start":
                 stream_id = data.get("stream_id")
                 start_data = data.get("start", {})
                 call_control_id = start_data.get("call_control_id")
+                # stream_id is fixed for the session, so pre-serialize the outbound frames
+                media_prefix, media_suffix = _split_frame_template(
+                    {"event": "media", "stream_id": stream_id, "media": {"payload": _PAYLOAD_SENTINEL}}
+                )
+                mark_frame = orjson.dumps(
+                    {"event": "mark", "stream_id": stream_id, "mark": {"name": "audio_end"}}
+                ).decode()
+                clear_frame = orjson.dumps({"event": "clear", "stream_id": stream_id}).decode()
                 logger.info(
                     f"Media stream started for call {call_control_id}, stream {stream_id}"
                 )
@@ -148,238 +324,282 @@ async def telnyx_media(ws: WebSocket):
                 logger.info("Media stream ended before start")
                 return
 
-        # Connect to OpenAI Realtime API over WebSocket
-        uri = "wss://api.openai.com/v1/realtime?model=gpt-realtime"
-        headers = {
-            "Authorization": f"Bearer {OPENAI_API_KEY}",
-        }
-
-        openai_ws = await websockets.connect(
-            uri, additional_headers=headers, ping_interval=20, ping_timeout=10
-        )
+        # Take a pre-warmed OpenAI Realtime WebSocket (or connect if none are idle)
+        openai_ws = await openai_pool.acquire()
         logger.info("Connected to OpenAI Realtime API")
 
-        # --- Correct Realtime session.update (includes session.type, nested audio, modalities) ---
-        session_config = {
-            "type": "realtime",
-            "model": "gpt-realtime",
-            "output_modalities": ["audio"],
-            "audio": {
-                "input": {
-                    "format": {"type": "audio/pcmu"},
-                    "transcription": {
-                        "model": "whisper-1"
-                    },
-                    "turn_detection": {
-                        "type": "semantic_vad",
-                        "eagerness": "high",
-                        "create_response": True,
-                        "interrupt_response": True
-                    },
-                },
-                "output": {
-                    "format": {"type": "audio/pcmu"},
-                    "voice": AGENT_VOICE
-                },
-            },
-            "instructions": get_formatted_instructions(),
-        }
-        
-        # Only include tools if there are any configured
-        function_tools = get_function_tools()
-        if function_tools and len(function_tools) > 0:
-            session_config["tools"] = function_tools
-            session_config["tool_choice"] = "auto"
-            tool_names = [tool["name"] for tool in function_tools]
-            logger.info(f"Including function tools: {', '.join(tool_names)}")
-        else:
-            logger.info("No function tools configured - session will not include tools")
-        
-        session_update = {
-            "type": "session.update",
-            "session": session_config
-        }
+        # --- Telnyx writer ---
+        # All outbound Telnyx frames go through one queue, in order, as (is_audio, data)
+        # where audio is base64 ASCII bytes and anything else a pre-serialized frame.
+        # Audio that piles up while a send is in flight goes out as a single media frame.
+        # Bounded, so a stalled Telnyx socket pushes back on the OpenAI reader instead of buffering a whole response
+        telnyx_out: asyncio.Queue = asyncio.Queue(maxsize=TELNYX_OUT_QUEUE_SIZE)
+
+        async def send_media(payload):
+            """Send one base64 payload (ASCII bytes) as a Telnyx media frame."""
+            await ws.send_text(media_prefix + payload.decode("ascii") + media_suffix)
+
+        # --- OpenAI writer ---
+        # Same scheme for caller audio and events going to OpenAI: appends that pile up
+        # go out as a single input_audio_buffer.append event
+        openai_out: asyncio.Queue = asyncio.Queue(maxsize=OPENAI_OUT_QUEUE_SIZE)
+
+        async def send_append(payload):
+            """Send one base64 payload (ASCII bytes) as an input_audio_buffer.append event."""
+            await openai_ws.send(_APPEND_PREFIX + payload + _APPEND_SUFFIX, text=True)
+
+        # --- OpenAI event handlers (return True to stop relaying, e.g. call is ending) ---
+        async def on_session_event(event):
+            logger.info(f"OpenAI session status: {event.get('type')}")
+
+        async def on_user_transcript(event):
+            transcript = event.get("transcript", "")
+            if transcript:
+                logger.info(f"[User transcript] {transcript}")
+
+        # Telnyx echoes each audio_end mark once the audio queued before it has played;
+        # audio_drained is set whenever every mark sent so far has come back
+        audio_drained = asyncio.Event()
+        marks = {"sent": 0, "played": 0}
+
+        async def on_audio_done(event):
+            # Marker to learn when the caller has actually heard the response
+            marks["sent"] += 1
+            audio_drained.clear()
+            await telnyx_out.put((False, mark_frame))
+
+            # Check for pending operations (hangup or transfer) after audio is done
+            if call_control_id and has_pending_operation(call_control_id):
+                logger.info(f"Audio done for call {call_control_id} with pending operations")
+                # Let the goodbye/transfer message finish playing, without waiting forever on a lost mark
+                try:
+                    await asyncio.wait_for(audio_drained.wait(), MARK_ECHO_TIMEOUT_SECS)
+                except TimeoutError:
+                    logger.info(f"No audio_end mark echo for call {call_control_id}, proceeding")
+                await execute_pending_operation(call_control_id, TELNYX_API_KEY)
+                # Exit the loop since call is ending
+                return True
+
+        async def on_speech_started(event):
+            logger.info("Caller started speaking")
+            await telnyx_out.put((False, clear_frame))
+
+        async def on_speech_stopped(event):
+            logger.info("Caller stopped speaking")
+
+        async def on_response_created(event):
+            logger.info("AI response started")
+
+        # Function calls run as their own tasks (tracked in function_tasks) so the
+        # reader keeps relaying audio meanwhile
+        async def on_function_call(event):
+            spawn_tracked(run_function_call(event), function_tasks)
+
+        async def run_function_call(event):
+            # Function call arguments are complete, execute the function
+            func_call_id = event.get("call_id")
+            func_name = event.get("name")
+            func_arguments = event.get("arguments")
+
+            logger.info(f"Function call request: {func_name} with args: {func_arguments}")
 
-        await openai_ws.send(json.dumps(session_update))
-        logger.info("Sent session configuration to OpenAI")
+            try:
+                # Parse function arguments
+                if isinstance(func_arguments, str):
+                    func_args = orjson.loads(func_arguments)
+                else:
+                    func_args = func_arguments
+
+                # Execute the function
+                result = await handle_function_call(
+                    func_name, func_args, call_control_id, TELNYX_API_KEY
+                )
 
-        # Wait for session confirmation
-        session_event_raw = await openai_ws.recv()
-        session_event = json.loads(session_event_raw)
-        logger.info(f"OpenAI session status: {session_event.get('type')}")
-
-        # --- Prompt an immediate greeting (audio) ---
-        greeting_event = {
-            "type": "response.create",
-            "response": {
-                "output_modalities": ["audio"],
-                "input": [],
-                "instructions": f"Say exactly this greeting: {AGENT_GREETING}",
-            },
+                # Send function result back to OpenAI
+                function_result = {
+                    "type": "conversation.item.create",
+                    "item": {
+                        "type": "function_call_output",
+                        "call_id": func_call_id,
+                        "output": result
+                    }
+                }
+                await openai_out.put((False, orjson.dumps(function_result)))
+
+                # Always request a response to let AI speak the function result
+                response_create = {
+                    "type": "response.create"
+                }
+                await openai_out.put((False, orjson.dumps(response_create)))
+
+                logger.info(f"Function call result sent: {result}")
+
+            except Exception as func_error:
+                logger.error(f"Error executing function {func_name}: {func_error}")
+                # Send error result back to OpenAI
+                error_result = {
+                    "type": "conversation.item.create",
+                    "item": {
+                        "type": "function_call_output",
+                        "call_id": func_call_id,
+                        "output": "Sorry, there was an error processing your request."
+                    }
+                }
+                await openai_out.put((False, orjson.dumps(error_result)))
+
+        async def on_response_done(event):
+            # Extract useful information from response.done event
+            response_data = event.get("response", {})
+            conversation_id = response_data.get("conversation_id", "unknown")
+            # Extract transcript from the first assistant audio output, stopping at the first match
+            transcript = next(
+                (
+                    content_item.get("transcript", "")
+                    for item in response_data.get("output", ())
+                    if item.get("type") == "message" and item.get("role") == "assistant"
+                    for content_item in item.get("content", ())
+                    if content_item.get("type") == "output_audio"
+                ),
+                "",
+            )
+
+            # Log essential information
+            logger.info(f"AI Response - Conv: {conversation_id}, Transcript: '{transcript}'")
+
+            # Note: Pending operations are handled in response.output_audio.done for better timing
+
+        async def on_error(event):
+            logger.error(f"OpenAI error: {event}")
+
+        # Dispatch table for everything but audio deltas, which take a direct fast path
+        openai_handlers = {
+            "session.created": on_session_event,
+            "session.updated": on_session_event,
+            "conversation.item.input_audio_transcription.completed": on_user_transcript,
+            "response.output_audio.done": on_audio_done,
+            "input_audio_buffer.speech_started": on_speech_started,
+            "input_audio_buffer.speech_stopped": on_speech_stopped,
+            "response.created": on_response_created,
+            "response.function_call_arguments.done": on_function_call,
+            "response.done": on_response_done,
+            "error": on_error,
         }
-        await openai_ws.send(json.dumps(greeting_event))
-        logger.info("Queued initial greeting to caller")
 
         async def handle_openai_events():
             """Forward OpenAI audio to Telnyx + log useful events."""
+            # Hot-loop attribute lookups bound once
+            recv, loads, put, get_handler = openai_ws.recv, orjson.loads, telnyx_out.put, openai_handlers.get
+            delta_type_token, delta_token = _DELTA_TYPE_TOKEN, _DELTA_TOKEN
+            delta_offset = len(_DELTA_TOKEN)
             try:
-                async for message in openai_ws:
+                while True:
+                    # Raw frame bytes go straight to orjson, skipping the UTF-8 decode to str
+                    message = await recv(decode=False)
                     try:
-                        event = json.loads(message)
+                        # Audio chunks dominate the stream: slice the base64 delta out of the
+                        # raw frame as bytes, without materializing the event dict
+                        if message.find(delta_type_token, 0, 128) != -1:
+                            start = message.find(delta_token)
+                            if start != -1:
+                                start += delta_offset
+                                end = message.find(b'"', start)
+                                if end > start:
+                                    await put((True, message[start:end]))
+                                continue
+
+                        event = loads(message)
                         etype = event.get("type", "")
 
-                        # Canonical audio events from Realtime (audio chunks and completion)
-                        
-                        # --- USER transcript ---
-                        if etype == "conversation.item.input_audio_transcription.completed":
-                            transcript = event.get("transcript", "")
-                            if transcript:
-                                logger.info(f"[User transcript] {transcript}")            
-                        elif etype == "response.output_audio.delta":
+                        # Delta in an unexpected shape, forward it from the parsed event
+                        if etype == "response.output_audio.delta":
                             audio_b64 = event.get("delta", "")
                             if audio_b64:
-                                await ws.send_json(
-                                    {
-                                        "event": "media",
-                                        "stream_id": stream_id,
-                                        "media": {"payload": audio_b64},
-                                    }
-                                )
-                        elif etype == "response.output_audio.done":
-                            # Optional marker to help you correlate ends on Telnyx side
-                            await ws.send_json(
-                                {
-                                    "event": "mark",
-                                    "stream_id": stream_id,
-                                    "mark": {"name": "audio_end"},
-                                }
-                            )
-                            
-                            # Check for pending operations (hangup or transfer) after audio is done
-                            if call_control_id and has_pending_operation(call_control_id):
-                                logger.info(f"Audio done for call {call_control_id} with pending operations")
-                                # Add a small delay to ensure the audio is fully transmitted
-                                await asyncio.sleep(2)
-                                await execute_pending_operation(call_control_id, TELNYX_API_KEY)
-                                # Exit the loop since call is ending
-                                break
-                        # Useful lifecycle events
-                        elif etype == "input_audio_buffer.speech_started":
-                            logger.info("Caller started speaking")
-                            await ws.send_json({"event": "clear", "stream_id": stream_id})
-                        elif etype == "input_audio_buffer.speech_stopped":
-                            logger.info("Caller stopped speaking")
-                        elif etype == "response.created":
-                            logger.info("AI response started")
-                        elif etype == "response.function_call_arguments.done":
-                            # Function call arguments are complete, execute the function
-                            func_call_id = event.get("call_id")
-                            func_name = event.get("name")
-                            func_arguments = event.get("arguments")
-                            
-                            logger.info(f"Function call request: {func_name} with args: {func_arguments}")
-                            
-                            try:
-                                # Parse function arguments
-                                if isinstance(func_arguments, str):
-                                    func_args = json.loads(func_arguments)
-                                else:
-                                    func_args = func_arguments
-                                
-                                # Execute the function
-                                result = await handle_function_call(
-                                    func_name, func_args, call_control_id, TELNYX_API_KEY
-                                )
-                                
-                                # Send function result back to OpenAI
-                                function_result = {
-                                    "type": "conversation.item.create",
-                                    "item": {
-                                        "type": "function_call_output",
-                                        "call_id": func_call_id,
-                                        "output": result
-                                    }
-                                }
-                                await openai_ws.send(json.dumps(function_result))
-                                
-                                # Always request a response to let AI speak the function result
-                                response_create = {
-                                    "type": "response.create"
-                                }
-                                await openai_ws.send(json.dumps(response_create))
-                                
-                                logger.info(f"Function call result sent: {result}")
-                                
-                            except Exception as func_error:
-                                logger.error(f"Error executing function {func_name}: {func_error}")
-                                # Send error result back to OpenAI
-                                error_result = {
-                                    "type": "conversation.item.create", 
-                                    "item": {
-                                        "type": "function_call_output",
-                                        "call_id": func_call_id,
-                                        "output": "Sorry, there was an error processing your request."
-                                    }
-                                }
-                                await openai_ws.send(json.dumps(error_result))
-                        elif etype == "response.done":
-                            # Extract useful information from response.done event
-                            response_data = event.get("response", {})
-                            conversation_id = response_data.get("conversation_id", "unknown")                            
-                            # Extract transcript from output
-                            transcript = ""
-                            output_items = response_data.get("output", [])
-                            for item in output_items:
-                                if item.get("type") == "message" and item.get("role") == "assistant":
-                                    content = item.get("content", [])
-                                    for content_item in content:
-                                        if content_item.get("type") == "output_audio":
-                                            transcript = content_item.get("transcript", "")
-                                            break
-                            
-                            # Log essential information
-                            logger.info(f"AI Response - Conv: {conversation_id}, Transcript: '{transcript}'")
-                            
-                            # Note: Pending operations are handled in response.output_audio.done for better timing
-                        elif etype == "error":
-                            logger.error(f"OpenAI error: {event}")
-
-                    except json.JSONDecodeError:
+                                await put((True, audio_b64.encode("ascii")))
+                            continue
+
+                        handler = get_handler(etype)
+                        if handler is not None and await handler(event):
+                            break
+
+                    except orjson.JSONDecodeError:
                         logger.warning("Received non-JSON message from OpenAI")
                     except Exception as e:
                         logger.error(f"Error processing OpenAI event: {e}")
 
-            except websockets.exceptions.ConnectionClosed:
+            except ConnectionClosed:
                 logger.info("OpenAI WebSocket connection closed")
             except Exception as e:
                 logger.error(f"Error in OpenAI event handler: {e}")
 
-        # Start the OpenAI event handler
-        forward_task = asyncio.create_task(handle_openai_events())
-
-        # Telnyx -> OpenAI (append inbound PCMU frames)
-        async for telnyx_message in ws.iter_json():
-            try:
-                event_type = telnyx_message.get("event")
-
-                if event_type == "media":
-                    media = telnyx_message.get("media", {})
-                    payload = media.get("payload")
-                    if payload:
-                        # Forward base64 PCMU bytes directly
-                        await openai_ws.send(
-                            json.dumps(
-                                {"type": "input_audio_buffer.append", "audio": payload}
-                            )
-                        )
-
-                elif event_type in ("stop", "callEnded"):
-                    logger.info(f"Telnyx media stream ended: {event_type}")
+        async def telnyx_pump():
+            """Telnyx -> OpenAI (append inbound PCMU frames)."""
+            # Hot-loop lookups bound once
+            put = openai_out.put
+            media_token, media_window, payload_token = _MEDIA_EVENT_TOKEN, _MEDIA_EVENT_WINDOW, _PAYLOAD_TOKEN
+            payload_offset = len(_PAYLOAD_TOKEN)
+            async for raw in ws.iter_text():
+                try:
+                    # Media frames dominate, slice the payload out without building a dict
+                    if raw.find(media_token, 0, media_window) != -1:
+                        start = raw.find(payload_token)
+                        if start != -1:
+                            start += payload_offset
+                            end = raw.find('"', start)
+                            if end > start:
+                                await put((True, raw[start:end].encode("ascii")))
+                            continue
+
+                    # Control frames (and any media frame in an unexpected shape) are parsed fully
+                    telnyx_message = orjson.loads(raw)
+                    event_type = telnyx_message.get("event")
+
+                    if event_type == "media":
+                        media = telnyx_message.get("media", {})
+                        payload = media.get("payload")
+                        if payload:
+                            # Forward base64 PCMU bytes directly
+                            await put((True, payload.encode("ascii")))
+
+                    elif event_type == "mark":
+                        if telnyx_message.get("mark", {}).get("name") == "audio_end":
+                            marks["played"] += 1
+                            if marks["played"] >= marks["sent"]:
+                                audio_drained.set()
+
+                    elif event_type in ("stop", "callEnded"):
+                        logger.info(f"Telnyx media stream ended: {event_type}")
+                        break
+
+                except Exception as e:
+                    logger.error(f"Error processing Telnyx message: {e}")
                     break
 
-            except Exception as e:
-                logger.error(f"Error processing Telnyx message: {e}")
-                break
+        # Session config and greeting are fixed for the process lifetime, send pre-serialized
+        await openai_ws.send(SESSION_UPDATE_BYTES, text=True)
+        logger.info("Sent session configuration to OpenAI")
+
+        # Both relay directions and both writers run in one group. The relay is over as soon
+        # as any of them stops (stream ended, socket closed, call handed off): a writer that
+        # died would otherwise leave its producer blocked on a full queue
+        async with asyncio.TaskGroup() as tg:
+            relay_tasks = (
+                tg.create_task(_drain(telnyx_out, send_media, ws.send_text, "Telnyx")),
+                tg.create_task(
+                    _drain(openai_out, send_append, functools.partial(openai_ws.send, text=True), "OpenAI")
+                ),
+                # Start the OpenAI event handler, the session ack is logged when it arrives
+                tg.create_task(handle_openai_events()),
+                tg.create_task(telnyx_pump()),
+            )
+
+            # --- Prompt an immediate greeting (audio) ---
+            # Pipelined behind session.update without waiting for the ack, events are applied in order
+            await openai_ws.send(GREETING_BYTES, text=True)
+            logger.info("Queued initial greeting to caller")
+
+            await asyncio.wait(relay_tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in relay_tasks:
+                task.cancel()
 
     except WebSocketDisconnect:
         logger.info("Telnyx WebSocket disconnected")
@@ -387,14 +607,11 @@ async def telnyx_media(ws: WebSocket):
         logger.error(f"Unexpected error in media handler: {e}")
     finally:
         # Cleanup
-        if forward_task and not forward_task.done():
-            forward_task.cancel()
-            try:
-                await forward_task
-            except asyncio.CancelledError:
-                pass
-            except Exception as e:
-                logger.error(f"Error cancelling forward task: {e}")
+        for task in list(function_tasks):
+            task.cancel()
+
+        if call_control_id:
+            clear_call_state(call_control_id)
 
         if openai_ws:
             try:
@@ -403,11 +620,11 @@ async def telnyx_media(ws: WebSocket):
             except Exception as e:
                 logger.error(f"Error closing OpenAI WebSocket: {e}")
 
-        try:
-            # 1 == OPEN in Starlette's WebSocketState
-            if ws.client_state.value == 1:
+        # Skip close when either side already closed, e.g. after a WebSocketDisconnect
+        if ws.client_state is WebSocketState.CONNECTED and ws.application_state is WebSocketState.CONNECTED:
+            try:
                 await ws.close()
-        except Exception as e:
-            logger.error(f"Error closing Telnyx WebSocket: {e}")
+            except Exception as e:
+                logger.error(f"Error closing Telnyx WebSocket: {e}")
 
         logger.info(f"Media session cleanup complete for call {call_control_id}")
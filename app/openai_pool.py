@@ -0,0 +1,133 @@
+"""
+Pool of pre-warmed OpenAI Realtime WebSocket connections
+Keeps TLS handshake and HTTP upgrade off the call setup path
+"""
+import asyncio
+import logging
+import time
+from typing import Optional, Set, Tuple
+
+import websockets
+from websockets.asyncio.client import ClientConnection
+from websockets.protocol import State
+
+from .utils.tasks import spawn_tracked
+
+logger = logging.getLogger(__name__)
+
+OPENAI_REALTIME_URL = "wss://api.openai.com/v1/realtime?model=gpt-realtime"
+
+# Idle connections older than this are replaced rather than handed out,
+# well within the Realtime API's maximum session duration
+MAX_IDLE_SECS = 600
+
+# The refresh loop checks idle connections this often and replaces any older than
+# REFRESH_AFTER_SECS (or already closed), so none reaches MAX_IDLE_SECS while idle
+REFRESH_CHECK_SECS = 30
+REFRESH_AFTER_SECS = MAX_IDLE_SECS - 2 * REFRESH_CHECK_SECS
+
+
+class OpenAIConnectionPool:
+    """
+    Holds up to `size` idle, never-used Realtime connections
+
+    Connections are single-use: a Realtime session keeps the conversation
+    history, so a connection is closed after its call instead of being
+    returned to the pool. Each acquire schedules a replacement in the background,
+    and a refresh loop replaces idle connections before they go stale, so light
+    traffic doesn't leave the next call with only expired connections.
+    """
+
+    def __init__(self, api_key: str, size: int):
+        self._headers = {"Authorization": f"Bearer {api_key}"}
+        self._size = size
+        self._idle: "asyncio.Queue[Tuple[float, ClientConnection]]" = asyncio.Queue()
+        self._warming: Set[asyncio.Task] = set()
+        self._closing: Set[asyncio.Task] = set()
+        self._refresher: Optional[asyncio.Task] = None
+
+    async def _connect(self) -> ClientConnection:
+        return await websockets.connect(
+            OPENAI_REALTIME_URL,
+            additional_headers=self._headers,
+            ping_interval=20,
+            ping_timeout=10,
+            # Base64 audio barely compresses, deflate would only cost CPU on every frame
+            compression=None,
+            # Events come from OpenAI only, response.done can outgrow the 1 MiB default
+            max_size=None,
+            # Let bursts of small appends buffer up before send() waits on a drain
+            write_limit=2**20,
+        )
+
+    async def _warm_one(self):
+        try:
+            conn = await self._connect()
+        except Exception as e:
+            logger.error(f"Error pre-warming OpenAI connection: {e}")
+            return
+        self._idle.put_nowait((time.monotonic(), conn))
+
+    def _refill(self):
+        """Start background connects until idle + warming connections reach the pool size"""
+        missing = self._size - self._idle.qsize() - len(self._warming)
+        for _ in range(missing):
+            spawn_tracked(self._warm_one(), self._warming)
+
+    def _close_in_background(self, conn: ClientConnection):
+        """Close a connection without making the caller wait on the close handshake"""
+        spawn_tracked(conn.close(), self._closing)
+
+    def _drop_stale(self):
+        """Close idle connections that are closed or due for replacement, keeping the rest in order"""
+        cutoff = time.monotonic() - REFRESH_AFTER_SECS
+        fresh = []
+        while not self._idle.empty():
+            created_at, conn = self._idle.get_nowait()
+            if conn.state is State.OPEN and created_at > cutoff:
+                fresh.append((created_at, conn))
+            else:
+                self._close_in_background(conn)
+        for item in fresh:
+            self._idle.put_nowait(item)
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(REFRESH_CHECK_SECS)
+            self._drop_stale()
+            self._refill()
+
+    def start(self):
+        """Begin warming connections, call once the event loop is running"""
+        if self._size > 0:
+            logger.info(f"Pre-warming {self._size} OpenAI Realtime connection(s)")
+            self._refresher = asyncio.create_task(self._refresh_loop())
+        self._refill()
+
+    async def acquire(self) -> ClientConnection:
+        """
+        Get an open connection, falling back to a fresh connect if none are idle
+
+        Returns:
+            A connection that has not carried any session yet
+        """
+        while not self._idle.empty():
+            created_at, conn = self._idle.get_nowait()
+            if conn.state is State.OPEN and time.monotonic() - created_at < MAX_IDLE_SECS:
+                self._refill()
+                return conn
+            # Closed by the server or too old, drop it and try the next one
+            self._close_in_background(conn)
+
+        self._refill()
+        return await self._connect()
+
+    async def close(self):
+        """Cancel pending warm-ups and close idle connections"""
+        if self._refresher is not None:
+            self._refresher.cancel()
+        for task in list(self._warming):
+            task.cancel()
+        while not self._idle.empty():
+            _, conn = self._idle.get_nowait()
+            await conn.close()
@@ -0,0 +1,66 @@
+"""
+Process-wide settings read once from the environment at import
+"""
+import os
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Departments available for call transfers, configured via
+# {DEPARTMENT}_SIP_URI and {DEPARTMENT}_P_Called_Party_ID_HEADER
+DEPARTMENT_NAMES = ("sales", "support", "billing")
+
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    telnyx_api_key: str
+    openai_api_key: str
+    public_domain: str  # e.g., voice.example.com
+    agent_voice: str
+    agent_instructions: Optional[str]
+    agent_greeting: Optional[str]
+    openai_pool_size: int  # idle pre-warmed OpenAI Realtime connections
+    # department name -> (sip_uri, P-Called-Party-ID header value)
+    departments: Dict[str, Tuple[str, str]]
+
+    @classmethod
+    def load(cls) -> "Settings":
+        """
+        Build settings from a single snapshot of the environment
+
+        Raises:
+            RuntimeError: If a required variable is missing
+        """
+        env = os.environ.copy()
+
+        telnyx_api_key = env.get("TELNYX_API_KEY")
+        openai_api_key = env.get("OPENAI_API_KEY")
+        public_domain = env.get("DOMAIN")
+
+        if not telnyx_api_key or not openai_api_key or not public_domain:
+            raise RuntimeError("Missing required env vars: TELNYX_API_KEY, OPENAI_API_KEY, DOMAIN")
+
+        departments = {
+            name: (
+                env.get(f"{name.upper()}_SIP_URI", ""),
+                env.get(f"{name.upper()}_P_Called_Party_ID_HEADER", ""),
+            )
+            for name in DEPARTMENT_NAMES
+        }
+
+        return cls(
+            telnyx_api_key=telnyx_api_key,
+            openai_api_key=openai_api_key,
+            public_domain=public_domain,
+            agent_voice=env.get("AGENT_VOICE", "marin"),  # alloy|echo|fable|onyx|nova|shimmer|marin
+            agent_instructions=env.get("AGENT_INSTRUCTIONS"),
+            agent_greeting=env.get("AGENT_GREETING"),
+            openai_pool_size=int(env.get("OPENAI_POOL_SIZE", "1")),
+            departments=departments,
+        )
+
+
+settings = Settings.load()
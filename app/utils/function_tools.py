@@ -2,54 +2,104 @@
 Function tools for OpenAI Realtime API integration with Telnyx
 Handles call ending and call transfer functionality
 """
+import asyncio
+import functools
 import json
 import logging
-from typing import Dict, Any
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional
+from .tasks import spawn_tracked
 from .telnyx_http import telnyx_cmd
 
 logger = logging.getLogger(__name__)
 
+@dataclass(frozen=True, slots=True)
+class CallState:
+    """Operation to run on a call once the AI has finished speaking"""
+    pending: str  # "hangup" or "transfer"
+    reason: str
+    department: Optional[str] = None
+    # Body of the Telnyx transfer command, shared with the department table and never mutated
+    transfer_payload: Optional[Dict[str, Any]] = None
+    created_at: float = field(default_factory=time.monotonic)
+
 # Store call states to track pending operations
-call_states = {}
+call_states: Dict[str, CallState] = {}
+
+# Longest execute_pending_operation() holds up its caller, below the HTTP client's 10s timeout
+OPERATION_TIMEOUT_SECS = 5.0
+
+# Call states older than this are dropped by sweep_call_states(), as a backstop for
+# sessions that ended without executing or clearing their state (e.g. a crashed handler)
+CALL_STATE_TTL_SECS = 1800
+CALL_STATE_SWEEP_INTERVAL_SECS = 60
+
+# Departments resolved by the first get_departments() call and the transfer table
+# built from them on first use, None until then so importing this module stays side-effect free
+_departments_cache = None
+_dept_table_cache = None
 
 def get_departments():
-    """Get department configuration from agent_config"""
+    """Get department configuration from agent_config, resolved once"""
+    global _departments_cache
+    if _departments_cache is not None:
+        return _departments_cache
     try:
         from ..agent_config import DEPARTMENTS
-        return DEPARTMENTS
+        _departments_cache = DEPARTMENTS
     except ImportError:
         logger.error("Could not import DEPARTMENTS from agent_config")
-        return {}
+        _departments_cache = ()
+    return _departments_cache
+
+def reset_departments_cache():
+    """Forget resolved departments and the transfer table built from them, e.g. after reloading agent_config"""
+    global _departments_cache, _dept_table_cache
+    _departments_cache = None
+    _dept_table_cache = None
+    _unknown_department_message.cache_clear()
+
+# end_call doesn't depend on configuration, so it is built once
+END_CALL_TOOL = {
+    "type": "function",
+    "name": "end_call",
+    "description": "End the current phone call when the caller wants to hang up or the conversation is complete.",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "reason": {
+                "type": "string",
+                "description": "The reason for ending the call",
+                "enum": ["conversation_complete", "caller_request", "escalation_needed"]
+            }
+        },
+        "required": ["reason"]
+    }
+}
+
+# (department names, tools) from the last get_function_tools() call
+_tools_cache = None
 
 def get_function_tools():
     """
     Returns the function tools configuration for OpenAI Realtime API
     Only includes tools if departments are properly configured
+
+    The list is cached per set of department names; callers must not mutate it
     """
+    global _tools_cache
     departments = get_departments()
-    tools = []
-    
+    department_names = [dept.name for dept in departments]
+    key = tuple(department_names)
+    if _tools_cache is not None and _tools_cache[0] == key:
+        return _tools_cache[1]
+
     # Always include end_call function
-    tools.append({
-        "type": "function",
-        "name": "end_call",
-        "description": "End the current phone call when the caller wants to hang up or the conversation is complete.",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "reason": {
-                    "type": "string",
-                    "description": "The reason for ending the call",
-                    "enum": ["conversation_complete", "caller_request", "escalation_needed"]
-                }
-            },
-            "required": ["reason"]
-        }
-    })
+    tools = [END_CALL_TOOL]
     
     # Only include transfer_call function if departments are configured
-    if departments and len(departments) > 0:
-        department_names = list(departments.keys())
+    if departments:
         tools.append({
             "type": "function", 
             "name": "transfer_call",
@@ -71,8 +121,47 @@ def get_function_tools():
             }
         })
     
+    _tools_cache = (key, tools)
     return tools
 
+def _build_dept_table():
+    """
+    Validate department configuration once and index it by name
+
+    Returns:
+        Dict of department name -> (SIP URI, transfer command body, transfer message)
+    """
+    table = {}
+    for dept in get_departments():
+        if not dept.sip_uri:
+            logger.warning("No SIP URI configured for department: %s", dept.name)
+        # Transfer payload only depends on the department, so it's built here rather than per transfer
+        transfer_payload = {
+            "to": dept.sip_uri,
+            "timeout_secs": 30,
+            "time_limit_secs": 3600,
+            "custom_headers": [{"name": "P-Called-Party-ID", "value": dept.header_value}],
+        }
+        table[dept.name] = (
+            dept.sip_uri,
+            transfer_payload,
+            f"Perfect! I'm transferring your call to our {dept.name} department now. Please hold on for just a moment while I connect you.",
+        )
+    return table
+
+def _get_dept_table():
+    """Department table, built (and validated) on first use"""
+    global _dept_table_cache
+    if _dept_table_cache is None:
+        _dept_table_cache = _build_dept_table()
+    return _dept_table_cache
+
+@functools.lru_cache(maxsize=32)
+def _unknown_department_message(department: str) -> str:
+    dept_table = _get_dept_table()
+    available_depts = ", ".join(dept_table) if dept_table else "sales, support, billing, technical, management"
+    return f"I'm sorry, I couldn't find the {department} department. Available departments are: {available_depts}. Let me connect you with our main support team instead."
+
 async def handle_function_call(
     func_name: str, 
     func_args: Dict[str, Any], 
@@ -93,42 +182,50 @@ async def handle_function_call(
     """
     try:
         # Check if there's already a pending operation for this call
-        existing_state = call_states.get(call_control_id, {})
+        existing_state = call_states.get(call_control_id)
+        pending = existing_state.pending if existing_state else None
         
         if func_name == "end_call":
             # Don't allow end_call if there's already a pending transfer
-            if existing_state.get("pending_transfer"):
-                logger.info(f"Ignoring end_call for {call_control_id} - transfer already pending")
+            if pending == "transfer":
+                logger.info("Ignoring end_call for %s - transfer already pending", call_control_id)
                 return "Transfer is already in progress."
             # Don't allow duplicate end_call requests
-            if existing_state.get("pending_hangup"):
-                logger.info(f"Ignoring duplicate end_call for {call_control_id} - hangup already pending")
+            if pending == "hangup":
+                logger.info("Ignoring duplicate end_call for %s - hangup already pending", call_control_id)
                 return "Call is already ending."
             return await handle_end_call(func_args, call_control_id, telnyx_api_key)
         elif func_name == "transfer_call":
             # Don't allow transfer if there's already a pending hangup
-            if existing_state.get("pending_hangup"):
-                logger.info(f"Ignoring transfer_call for {call_control_id} - hangup already pending")
+            if pending == "hangup":
+                logger.info("Ignoring transfer_call for %s - hangup already pending", call_control_id)
                 return "Call is already ending."
             # Don't allow duplicate transfer calls
-            if existing_state.get("pending_transfer"):
-                existing_dept = existing_state.get("department")
+            if pending == "transfer":
+                existing_dept = existing_state.department
                 new_dept = func_args.get("department")
                 if existing_dept == new_dept:
-                    logger.info(f"Ignoring duplicate transfer_call for {call_control_id} - transfer to {new_dept} already pending")
+                    logger.info("Ignoring duplicate transfer_call for %s - transfer to %s already pending", call_control_id, new_dept)
                     return "Transfer is already in progress."
                 else:
-                    logger.info(f"Updating transfer destination from {existing_dept} to {new_dept}")
+                    logger.info("Updating transfer destination from %s to %s", existing_dept, new_dept)
                     # Allow the new transfer call to override the previous one
             return await handle_transfer_call(func_args, call_control_id, telnyx_api_key)
         else:
-            logger.error(f"Unknown function called: {func_name}")
+            logger.error("Unknown function called: %s", func_name)
             return "I'm sorry, I couldn't process that request."
             
     except Exception as e:
-        logger.error(f"Error handling function call {func_name}: {e}")
+        logger.error("Error handling function call %s: %s", func_name, e)
         return "I'm sorry, there was an error processing your request."
 
+# Goodbye message per end_call reason, unknown reasons get "conversation_complete"
+_GOODBYE_MSGS = {
+    "caller_request": "Thank you for calling! Have a wonderful day!",
+    "escalation_needed": "I'll connect you with someone who can better assist you. Thank you for your patience!",
+    "conversation_complete": "Thank you so much for calling! Have a great day!",
+}
+
 async def handle_end_call(func_args: Dict[str, Any], call_control_id: str, telnyx_api_key: str) -> str:
     """
     Handle end call function
@@ -144,20 +241,12 @@ async def handle_end_call(func_args: Dict[str, Any], call_control_id: str, telny
     reason = func_args.get("reason", "conversation_complete")
     
     # Mark call for hangup (don't hang up immediately to allow final response)
-    call_states[call_control_id] = {
-        "pending_hangup": True,
-        "reason": reason
-    }
+    call_states[call_control_id] = CallState(pending="hangup", reason=reason)
     
-    logger.info(f"Marked call {call_control_id} for hangup with reason: {reason}")
+    logger.info("Marked call %s for hangup with reason: %s", call_control_id, reason)
     
     # Return appropriate goodbye message based on reason
-    if reason == "caller_request":
-        return "Thank you for calling! Have a wonderful day!"
-    elif reason == "escalation_needed":
-        return "I'll connect you with someone who can better assist you. Thank you for your patience!"
-    else:
-        return "Thank you so much for calling! Have a great day!"
+    return _GOODBYE_MSGS.get(reason, _GOODBYE_MSGS["conversation_complete"])
 
 async def handle_transfer_call(func_args: Dict[str, Any], call_control_id: str, telnyx_api_key: str) -> str:
     """
@@ -175,101 +264,87 @@ async def handle_transfer_call(func_args: Dict[str, Any], call_control_id: str,
     reason = func_args.get("reason", "Customer requested transfer")
     
     # Get department configuration
-    departments = get_departments()
+    entry = _get_dept_table().get(department)
     
-    if not department or department not in departments:
-        available_depts = ", ".join(departments.keys()) if departments else "sales, support, billing, technical, management"
-        logger.error(f"No configuration found for department: {department}")
-        return f"I'm sorry, I couldn't find the {department} department. Available departments are: {available_depts}. Let me connect you with our main support team instead."
+    if entry is None:
+        logger.error("No configuration found for department: %s", department)
+        return _unknown_department_message(str(department))
     
-    dept_config = departments[department]
-    destination = dept_config.get("sip_uri")
-    headers = dept_config.get("headers", [])
+    destination, transfer_payload, transfer_message = entry
     
     if not destination:
-        logger.error(f"No SIP URI configured for department: {department}")
+        logger.error("No SIP URI configured for department: %s", department)
         return f"I'm sorry, there's a configuration issue with the {department} department. Let me connect you with our main support team instead."
     
     # Mark call for transfer (don't transfer immediately to allow final response)
-    call_states[call_control_id] = {
-        "pending_transfer": True,
-        "department": department,
-        "destination": destination,
-        "headers": headers,
-        "reason": reason
-    }
+    call_states[call_control_id] = CallState(
+        pending="transfer",
+        reason=reason,
+        department=department,
+        transfer_payload=transfer_payload,
+    )
     
-    logger.info(f"Marked call {call_control_id} for transfer to {department} department")
+    logger.info("Marked call %s for transfer to %s department", call_control_id, department)
     
-    return f"Perfect! I'm transferring your call to our {department} department now. Please hold on for just a moment while I connect you."
+    return transfer_message
+
+async def _hangup(call_control_id: str, telnyx_api_key: str):
+    try:
+        await telnyx_cmd(call_control_id, "hangup", telnyx_api_key)
+    except Exception as e:
+        logger.error("Error hanging up call %s: %s", call_control_id, e)
 
 async def execute_pending_operation(call_control_id: str, telnyx_api_key: str):
     """
     Execute pending call operations (hangup or transfer) after AI response is complete
+
+    The operation runs as its own task: cancelling the caller (e.g. media session
+    cleanup) doesn't abort an in-flight transfer, and the caller waits at most
+    OPERATION_TIMEOUT_SECS before the operation is left to finish in the background
     
     Args:
         call_control_id: Telnyx call control ID
         telnyx_api_key: Telnyx API key
     """
-    if call_control_id not in call_states:
+    # Claim the operation by removing its state, a concurrent caller finds nothing and returns
+    state = call_states.pop(call_control_id, None)
+    if state is None:
         return
-        
-    state = call_states[call_control_id]
-    
-    # Check if already executed to prevent duplicates
-    if state.get("executed"):
-        logger.info(f"Pending operation for {call_control_id} already executed")
-        return
-    
-    # Mark as executed to prevent duplicate execution
-    state["executed"] = True
-    
+
+    task = spawn_tracked(_run_operation(call_control_id, telnyx_api_key, state))
     try:
-        # Always prioritize transfer over hangup
-        if state.get("pending_transfer"):
-            department = state.get("department")
-            destination = state.get("destination")
-            headers = state.get("headers", [])
-            
-            logger.info(f"Executing transfer for call {call_control_id} to {department}")
-            
-            # Create transfer payload
-            transfer_payload = {
-                "to": destination,
-                "timeout_secs": 30,
-                "time_limit_secs": 3600
-            }
+        await asyncio.wait_for(asyncio.shield(task), OPERATION_TIMEOUT_SECS)
+    except TimeoutError:
+        # Not treated as a failure: hanging up now could cut off a transfer that is about to succeed
+        logger.warning("Pending %s for call %s still running after %ss, finishing in the background",
+                       state.pending, call_control_id, OPERATION_TIMEOUT_SECS)
+
+async def _run_operation(call_control_id: str, telnyx_api_key: str, state: CallState):
+    try:
+        pending = state.pending
+        if pending == "transfer":
+            department = state.department
             
-            # Add SIP headers if configured
-            if headers:
-                transfer_payload["custom_headers"] = headers
+            logger.info("Executing transfer for call %s to %s", call_control_id, department)
             
-            # Execute the transfer
-            response = await telnyx_cmd(call_control_id, "transfer", telnyx_api_key, transfer_payload)
+            # Execute the transfer with the payload prepared when the call was marked
+            response = await telnyx_cmd(call_control_id, "transfer", telnyx_api_key, state.transfer_payload)
             
             if response.is_success:
-                logger.info(f"Successfully transferred call {call_control_id} to {department}")
+                logger.info("Successfully transferred call %s to %s", call_control_id, department)
             else:
-                logger.error(f"Transfer failed for call {call_control_id}: {response.status_code} {response.text}")
+                logger.error("Transfer failed for call %s: %s %s", call_control_id, response.status_code, response.text)
                 # If transfer fails, hang up the call
-                await telnyx_cmd(call_control_id, "hangup", telnyx_api_key)
+                await _hangup(call_control_id, telnyx_api_key)
                 
-        elif state.get("pending_hangup"):
-            logger.info(f"Executing hangup for call {call_control_id}")
+        elif pending == "hangup":
+            logger.info("Executing hangup for call %s", call_control_id)
             await telnyx_cmd(call_control_id, "hangup", telnyx_api_key)
                 
     except Exception as e:
-        logger.error(f"Error executing pending operation for call {call_control_id}: {e}")
+        logger.error("Error executing pending operation for call %s: %s", call_control_id, e)
         # On error, try to hang up the call gracefully
-        try:
-            await telnyx_cmd(call_control_id, "hangup", telnyx_api_key)
-        except Exception as hangup_error:
-            logger.error(f"Error hanging up call {call_control_id} after operation error: {hangup_error}")
-    
-    finally:
-        # Clean up call state
-        if call_control_id in call_states:
-            del call_states[call_control_id]
+        await _hangup(call_control_id, telnyx_api_key)
 
 def has_pending_operation(call_control_id: str) -> bool:
     """
@@ -281,8 +356,28 @@ def has_pending_operation(call_control_id: str) -> bool:
     Returns:
         True if call has pending operations
     """
-    if call_control_id not in call_states:
-        return False
-        
-    state = call_states[call_control_id]
-    return state.get("pending_hangup", False) or state.get("pending_transfer", False)
+    # Every stored state has an operation pending
+    return call_control_id in call_states
+
+def clear_call_state(call_control_id: str):
+    """
+    Drop any call state left behind when a call's media session ends
+
+    A caller can hang up after end_call/transfer_call marked the call but before
+    the pending operation ran, which would otherwise leave the entry behind for good
+
+    Args:
+        call_control_id: Telnyx call control ID
+    """
+    call_states.pop(call_control_id, None)
+
+async def sweep_call_states():
+    """Periodically evict call states older than CALL_STATE_TTL_SECS, run as a task for the app's lifetime"""
+    while True:
+        await asyncio.sleep(CALL_STATE_SWEEP_INTERVAL_SECS)
+        cutoff = time.monotonic() - CALL_STATE_TTL_SECS
+        expired = [cid for cid, state in call_states.items() if state.created_at < cutoff]
+        for cid in expired:
+            del call_states[cid]
+        if expired:
+            logger.warning("Evicted %s expired call state(s)", len(expired))
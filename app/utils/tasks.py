@@ -0,0 +1,29 @@
+"""
+Fire-and-forget asyncio tasks
+"""
+import asyncio
+from typing import Coroutine, Optional, Set
+
+# The event loop only keeps weak references to tasks, so running tasks are held
+# in a set until they finish to keep them from being garbage collected mid-flight
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def spawn_tracked(coro: Coroutine, tasks: Optional[Set[asyncio.Task]] = None) -> asyncio.Task:
+    """
+    Start a coroutine as a task that stays referenced until it finishes
+
+    Args:
+        coro: Coroutine to run
+        tasks: Set to hold the task in, e.g. to count or cancel a group of tasks;
+            defaults to a module-wide set
+
+    Returns:
+        The started task
+    """
+    if tasks is None:
+        tasks = _background_tasks
+    task = asyncio.create_task(coro)
+    tasks.add(task)
+    task.add_done_callback(tasks.discard)
+    return task
@@ -1,17 +1,57 @@
+import functools
+from types import MappingProxyType
+from typing import Mapping
+
 import httpx
+import orjson
 
 
 TELNYX_BASE_URL = "https://api.telnyx.com/v2/calls"
 
+# Shared client so call commands reuse kept-alive connections to api.telnyx.com
+_client: httpx.AsyncClient | None = None
 
-async def telnyx_cmd(call_control_id: str, action: str, telnyx_api_key: str, body: dict | None = None) -> httpx.Response:
-    url = f"{TELNYX_BASE_URL}/{call_control_id}/actions/{action}"
-    headers = {
+
+def _get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url=TELNYX_BASE_URL,
+            timeout=10.0,
+            # Limits go on the transport, the client ignores its own when given one.
+            # retries=1 retries a failed connect (e.g. a DNS blip), never a sent request
+            transport=httpx.AsyncHTTPTransport(
+                retries=1,
+                limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+            ),
+        )
+    return _client
+
+
+def open_client() -> None:
+    """Create the shared client up front, call once at app startup"""
+    _get_client()
+
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+@functools.lru_cache(maxsize=4)
+def _build_headers(telnyx_api_key: str) -> Mapping[str, str]:
+    """Request headers per API key, read-only since the same mapping is shared by every request"""
+    return MappingProxyType({
         "Authorization": f"Bearer {telnyx_api_key}",
         "Content-Type": "application/json",
-    }
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        resp = await client.post(url, headers=headers, json=body)
-        return resp
+    })
 
 
+async def telnyx_cmd(call_control_id: str, action: str, telnyx_api_key: str, body: dict | None = None) -> httpx.Response:
+    url = f"/{call_control_id}/actions/{action}"
+    # Content-Type is already in the shared headers, so the body is sent as pre-encoded bytes
+    content = orjson.dumps(body) if body is not None else None
+    resp = await _get_client().post(url, headers=_build_headers(telnyx_api_key), content=content)
+    return resp